@@ -32,6 +32,12 @@ class ProductAdmin(admin.ModelAdmin):
     search_fields = ("name", "description", "brand__name", "category__name")
     prepopulated_fields = {"slug": ("name",)}
     list_per_page = 25
+    list_select_related = ("brand", "category")
+
+    def get_queryset(self, request):
+        # Shared by the changelist, autocomplete and delete confirmation; the
+        # changelist skips list_select_related once select_related is set.
+        return super().get_queryset(request).select_related(*self.list_select_related)
 
 
 @admin.register(CartItem)
@@ -39,3 +45,9 @@ class CartItemAdmin(admin.ModelAdmin):
     list_display = ("__str__", "user", "session_id", "product", "quantity", "added_at")
     search_fields = ("session_id", "product__name", "user__username")
     list_filter = ("user",)
+    list_select_related = ("product", "product__brand", "user")
+
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        if db_field.name == "product":
+            kwargs["queryset"] = Product.objects.select_related("brand")
+        return super().formfield_for_foreignkey(db_field, request, **kwargs)
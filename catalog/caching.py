@@ -0,0 +1,42 @@
+import hashlib
+import time
+from urllib.parse import urlencode
+
+from django.core.cache import cache
+
+# Process-local copies of small, hot entries: namespace -> (version, {key: value}).
+# Entries are only served while the shared version matches, so a bump
+# anywhere invalidates every worker's copy without pub/sub.
+_local = {}
+LOCAL_MAX_ENTRIES = 256
+
+
+def get_version(namespace):
+    """Current generation of a cache namespace; bumped whenever its data changes."""
+    return cache.get_or_set(f"{namespace}:ver", time.time_ns, None)
+
+
+def bump_version(namespace):
+    """Make every key built for ``namespace`` unreachable at once."""
+    cache.set(f"{namespace}:ver", time.time_ns(), None)
+
+
+def make_key(namespace, kind, params, exclude=()):
+    """Build a versioned cache key from normalized query parameters."""
+    items = sorted((k, v) for k, v in params.items() if k not in exclude)
+    digest = hashlib.blake2b(urlencode(items).encode(), digest_size=16).hexdigest()
+    return f"{namespace}:{kind}:v{get_version(namespace)}:{digest}"
+
+
+def get_local(namespace, version, key):
+    entry = _local.get(namespace)
+    if entry is None or entry[0] != version:
+        return None
+    return entry[1].get(key)
+
+
+def set_local(namespace, version, key, value):
+    entry = _local.get(namespace)
+    if entry is None or entry[0] != version or len(entry[1]) >= LOCAL_MAX_ENTRIES:
+        entry = _local[namespace] = (version, {})
+    entry[1][key] = value
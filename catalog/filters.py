@@ -0,0 +1,59 @@
+import django_filters
+from django_filters.rest_framework import DjangoFilterBackend
+from django_filters.widgets import BooleanWidget
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import SearchFilter
+
+from . import service
+from .models import Product
+
+
+class FlagWidget(BooleanWidget):
+    """Reads ``?in_stock=`` with service.parse_bool (true/1/yes/t/on...)."""
+
+    def value_from_datadict(self, data, files, name):
+        value = data.get(name)
+        if value is None or value == "":
+            return None
+        return service.parse_bool(value)
+
+
+class ProductFilter(django_filters.FilterSet):
+    # Plain ids: ModelChoiceFilter would run a lookup query to validate them.
+    brand = django_filters.NumberFilter(field_name="brand")
+    category = django_filters.NumberFilter(field_name="category")
+    min_price = django_filters.NumberFilter(field_name="price", lookup_expr="gte")
+    max_price = django_filters.NumberFilter(field_name="price", lookup_expr="lte")
+    in_stock = django_filters.BooleanFilter(widget=FlagWidget)
+
+    class Meta:
+        model = Product
+        fields = ["brand", "category", "in_stock"]
+
+
+class InvalidFilters(ValidationError):
+    """Raised for invalid filter query parameters (e.g. ``?min_price=cheap``)."""
+
+
+class ProductFilterBackend(DjangoFilterBackend):
+    """DjangoFilterBackend whose validation errors can be told apart by views."""
+
+    def filter_queryset(self, request, queryset, view):
+        try:
+            return super().filter_queryset(request, queryset, view)
+        except ValidationError as exc:
+            raise InvalidFilters(exc.detail) from exc
+
+
+class ProductSearchFilter(SearchFilter):
+    """
+    ?search= backed by service.search_products(), so PostgreSQL uses the
+    full-text and trigram indexes rather than plain per-field icontains, and
+    ranks matches by relevance unless ?ordering= is given.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        search = " ".join(self.get_search_terms(request))
+        if not search:
+            return queryset
+        return service.search_products(queryset, search)
@@ -0,0 +1,21 @@
+from django.db.models.lookups import IContains
+
+
+class TrigramIContains(IContains):
+    """
+    ``icontains`` compiled to a bare ``column ILIKE '%term%'`` on PostgreSQL.
+
+    The stock lookup compiles to ``UPPER(column::text) LIKE UPPER(...)``, which
+    the pg_trgm GIN indexes on the plain columns (migration 0006) cannot
+    serve. Other backends get the stock ``icontains`` SQL.
+    """
+
+    lookup_name = "trgm_icontains"
+
+    def as_sql(self, compiler, connection):
+        return compiler.compile(IContains(self.lhs, self.rhs))
+
+    def as_postgresql(self, compiler, connection):
+        lhs_sql, lhs_params = compiler.compile(self.lhs)
+        rhs_sql, rhs_params = self.process_rhs(compiler, connection)
+        return f"{lhs_sql} ILIKE {rhs_sql}", (*lhs_params, *rhs_params)
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.6 on 2026-10-14 10:58
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("catalog", "0002_alter_product_price"),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name="brand",
+            constraint=models.UniqueConstraint(
+                django.db.models.functions.text.Lower("name"), name="brand_name_ci_uniq"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="category",
+            constraint=models.UniqueConstraint(
+                django.db.models.functions.text.Lower("name"),
+                name="category_name_ci_uniq",
+            ),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.6 on 2026-10-14 11:20
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+SEARCH_INDEX = "catalog_pro_search_gin_idx"
+
+
+def create_search_index(apps, schema_editor):
+    # GIN indexes and tsvector functions only exist on PostgreSQL.
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(
+        f"CREATE INDEX {SEARCH_INDEX} ON catalog_product USING gin (search_vector)"
+    )
+    schema_editor.execute(
+        "UPDATE catalog_product SET search_vector = "
+        "setweight(to_tsvector('english', coalesce(name, '')), 'A') || "
+        "setweight(to_tsvector('english', coalesce(description, '')), 'B')"
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(f"DROP INDEX IF EXISTS {SEARCH_INDEX}")
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("catalog", "0003_name_ci_unique"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="product",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(
+                editable=False, null=True
+            ),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.6 on 2026-10-14 11:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("catalog", "0004_product_search_vector"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(
+                fields=["brand", "in_stock", "price"],
+                name="catalog_pro_brand_i_3ce3bb_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(
+                fields=["category", "in_stock", "price"],
+                name="catalog_pro_categor_fa3c67_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(
+                fields=["in_stock", "-created_at"],
+                name="catalog_pro_in_stoc_a6a9a4_idx",
+            ),
+        ),
+    ]
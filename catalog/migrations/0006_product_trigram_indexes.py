@@ -0,0 +1,37 @@
+# Generated by Django 5.2.6 on 2026-10-14 12:05
+
+from django.db import migrations
+
+TRIGRAM_INDEXES = {
+    "idx_product_name_trgm": "name",
+    "idx_product_description_trgm": "description",
+}
+
+
+def create_trigram_indexes(apps, schema_editor):
+    # pg_trgm lets ILIKE '%term%' use a GIN index instead of a sequential scan.
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for index, column in TRIGRAM_INDEXES.items():
+        schema_editor.execute(
+            f"CREATE INDEX IF NOT EXISTS {index} ON catalog_product "
+            f"USING gin ({column} gin_trgm_ops)"
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for index in TRIGRAM_INDEXES:
+        schema_editor.execute(f"DROP INDEX IF EXISTS {index}")
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("catalog", "0005_product_filter_indexes"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
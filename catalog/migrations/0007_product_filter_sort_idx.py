@@ -0,0 +1,19 @@
+# Generated by Django 5.2.6 on 2026-10-14 12:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("catalog", "0006_product_trigram_indexes"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(
+                fields=["category", "brand", "in_stock", "price"],
+                name="prod_filter_sort_idx",
+            ),
+        ),
+    ]
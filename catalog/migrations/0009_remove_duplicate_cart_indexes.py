@@ -0,0 +1,20 @@
+# Generated by Django 5.2.6 on 2026-10-14 13:40
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("catalog", "0008_product_search_vector_trigger"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="cartitem",
+            name="catalog_car_session_0848e8_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="cartitem",
+            name="catalog_car_user_id_7ab62b_idx",
+        ),
+    ]
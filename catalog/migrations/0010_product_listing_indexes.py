@@ -0,0 +1,25 @@
+# Generated by Django 5.2.6 on 2026-10-14 11:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("catalog", "0009_remove_duplicate_cart_indexes"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(
+                fields=["brand", "in_stock", "-created_at"],
+                name="catalog_pro_brand_i_f1200b_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(
+                fields=["category", "price"], name="catalog_pro_categor_5a4a66_idx"
+            ),
+        ),
+    ]
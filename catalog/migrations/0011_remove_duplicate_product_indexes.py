@@ -0,0 +1,20 @@
+# Generated by Django 5.2.6 on 2026-10-14 11:51
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("catalog", "0010_product_listing_indexes"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="product",
+            name="catalog_pro_in_stoc_df7d56_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="product",
+            name="catalog_pro_created_92b554_idx",
+        ),
+    ]
@@ -1,26 +1,38 @@
 from decimal import Decimal
 
 from django.conf import settings
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
 from django.db.models import Index, Q, UniqueConstraint
+from django.db.models.functions import Lower
 from django.utils.text import slugify
 
+from .lookups import TrigramIContains
+
+# Text search configuration used for Product.search_vector and its queries.
+SEARCH_CONFIG = "english"
+
 
 def generate_unique_slug(instance, value):
-    """Make a slug and ensure it's unique for the model by adding -1, -2... if needed."""
+    """Make a slug and ensure it's unique for the model by adding -1, -2... if needed.
+
+    All taken slugs sharing the base are fetched in a single query and the
+    counter is advanced in memory, instead of one query per collision.
+    """
     base_slug = slugify(value)[:200]
-    slug = base_slug
     Model = instance.__class__
-    num = 1
-    while (
-        Model.objects.filter(slug=slug)
+    existing = set(
+        Model.objects.filter(Q(slug=base_slug) | Q(slug__startswith=f"{base_slug}-"))
         .exclude(pk=getattr(instance, "pk", None))
-        .exists()
-    ):
-        slug = f"{base_slug}-{num}"
+        .values_list("slug", flat=True)
+    )
+    if base_slug not in existing:
+        return base_slug
+    num = 1
+    while f"{base_slug}-{num}" in existing:
         num += 1
-    return slug
+    return f"{base_slug}-{num}"
 
 
 class Brand(models.Model):
@@ -30,6 +42,7 @@ class Brand(models.Model):
     class Meta:
         ordering = ["name"]
         indexes = [Index(fields=["slug"]), Index(fields=["name"])]
+        constraints = [UniqueConstraint(Lower("name"), name="brand_name_ci_uniq")]
 
     def save(self, *args, **kwargs):
         if not self.slug:
@@ -47,6 +60,7 @@ class Category(models.Model):
     class Meta:
         ordering = ["name"]
         indexes = [Index(fields=["slug"]), Index(fields=["name"])]
+        constraints = [UniqueConstraint(Lower("name"), name="category_name_ci_uniq")]
 
     def save(self, *args, **kwargs):
         if not self.slug:
@@ -81,14 +95,28 @@ class Product(models.Model):
     image_url = models.URLField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True, db_index=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # PostgreSQL full-text document (GIN indexed), maintained by a database
+    # trigger (migration 0008); stays NULL on other backends.
+    search_vector = SearchVectorField(null=True, editable=False)
 
     class Meta:
         ordering = ["-created_at"]
         indexes = [
+            # in_stock and created_at are covered by their db_index.
             Index(fields=["price"]),
             Index(fields=["rating"]),
-            Index(fields=["in_stock"]),
-            Index(fields=["created_at"]),
+            # Composite indexes for the common get_products filter shapes.
+            Index(fields=["brand", "in_stock", "price"]),
+            Index(fields=["category", "in_stock", "price"]),
+            Index(fields=["in_stock", "-created_at"]),
+            # Brand listings in the default (newest first) order, and category
+            # listings ordered or ranged by price regardless of stock.
+            Index(fields=["brand", "in_stock", "-created_at"]),
+            Index(fields=["category", "price"]),
+            Index(
+                fields=["category", "brand", "in_stock", "price"],
+                name="prod_filter_sort_idx",
+            ),
         ]
 
     def save(self, *args, **kwargs):
@@ -100,6 +128,11 @@ class Product(models.Model):
         return f"{self.name} ({self.brand.name})"
 
 
+# Substring search on these columns goes through their pg_trgm indexes.
+for _field in ("name", "description"):
+    Product._meta.get_field(_field).register_lookup(TrigramIContains)
+
+
 class CartItem(models.Model):
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
@@ -108,6 +141,7 @@ class CartItem(models.Model):
         on_delete=models.CASCADE,
         related_name="cart_items",
     )
+    # db_index covers the session filter; user_id is indexed as a foreign key.
     session_id = models.CharField(max_length=64, null=True, blank=True, db_index=True)
     product = models.ForeignKey(
         Product, on_delete=models.CASCADE, related_name="cart_items"
@@ -130,7 +164,6 @@ class CartItem(models.Model):
                 name="unique_session_product",
             ),
         ]
-        indexes = [Index(fields=["session_id"]), Index(fields=["user"])]
 
     def __str__(self):
         who = self.user.username if self.user_id else f"session:{self.session_id}"
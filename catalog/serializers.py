@@ -1,42 +1,170 @@
+from copy import copy
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils.functional import cached_property
 from rest_framework import serializers
 
 from .models import Brand, CartItem, Category, Product
 
+INVALID_PK_MESSAGE = 'Invalid pk "{pk}" - object does not exist.'
+
+# Fields whose representation differs from the raw database value.
+_FORMATTED_FIELDS = (
+    serializers.DecimalField,
+    serializers.DateTimeField,
+    serializers.DateField,
+)
+
+
+class CachedFieldsSerializer(serializers.ModelSerializer):
+    """
+    ModelSerializer that builds its field set once per class.
+
+    get_fields() introspects the model and deep-copies declared fields on every
+    instantiation; cache the result per serializer class and hand each instance
+    shallow copies, which is enough since fields are re-bound on use.
+    """
+
+    _fields_cache = {}
+
+    def get_fields(self):
+        cls = self.__class__
+        fields = self._fields_cache.get(cls)
+        if fields is None:
+            fields = self._fields_cache[cls] = super().get_fields()
+        return {name: copy(field) for name, field in fields.items()}
+
+
+class ValuesRowsMixin:
+    """
+    Read path that skips model instances: ``values()`` rows are formatted into
+    the same dicts ``to_representation()`` would produce.
+    """
+
+    def value_paths(self):
+        """
+        ``(key, ORM path)`` for every readable field; dotted sources become
+        ``__`` paths and nested serializers are flattened as ``name.subkey``.
+        """
+        paths = []
+        for name, field in self.fields.items():
+            if field.write_only:
+                continue
+            path = field.source.replace(".", "__")
+            if isinstance(field, ValuesRowsMixin):
+                paths += [
+                    (f"{name}.{key}", f"{path}__{sub_path}")
+                    for key, sub_path in field.value_paths()
+                ]
+            else:
+                paths.append((name, path))
+        return paths
+
+    def values(self, queryset):
+        """Project ``queryset`` onto the readable fields with ``values()``."""
+        columns, aliases = [], {}
+        for key, path in self.value_paths():
+            if key == path:
+                columns.append(path)
+            else:
+                aliases[key] = F(path)
+        return queryset.values(*columns, **aliases)
+
+    @cached_property
+    def _row_formatters(self):
+        # Resolved once per serializer instance, so the per-row loop in
+        # to_row() only visits the decimal/date columns and nested objects.
+        formatters, nested = [], []
+        for name, field in self.fields.items():
+            if field.write_only:
+                continue
+            if isinstance(field, ValuesRowsMixin):
+                nested.append((f"{name}.", name, field))
+            elif isinstance(field, _FORMATTED_FIELDS):
+                formatters.append((name, field.to_representation))
+        return formatters, nested
+
+    def to_row(self, row):
+        """
+        Format a ``values()`` row exactly like ``to_representation()``.
+
+        Works on a copy: paginators still read the raw rows afterwards (the
+        cursor paginator compares their timestamps to build ``next``).
+        """
+        row = dict(row)
+        formatters, nested = self._row_formatters
+        for prefix, name, field in nested:
+            keys = [key for key in row if key.startswith(prefix)]
+            row[name] = field.to_row({key[len(prefix) :]: row.pop(key) for key in keys})
+        for name, to_representation in formatters:
+            value = row[name]
+            if value is not None:
+                row[name] = to_representation(value)
+        return row
+
+
+class UniqueNameMixin:
+    """
+    Name uniqueness is enforced by the case-insensitive DB constraint instead of
+    a lookup query; turn a violation into an API-friendly error message.
+    """
+
+    duplicate_name_message = "An object with this name already exists."
+    # The case-insensitive UniqueConstraint declared on the model.
+    name_constraint = None
+
+    def save(self, **kwargs):
+        try:
+            with transaction.atomic():
+                return super().save(**kwargs)
+        except IntegrityError as exc:
+            if not self.is_duplicate_name(exc):
+                raise
+            raise serializers.ValidationError({"name": self.duplicate_name_message})
+
+    def is_duplicate_name(self, exc):
+        """Whether ``exc`` violates a unique constraint on the name (not slug)."""
+        table = self.Meta.model._meta.db_table
+        # psycopg reports the constraint; SQLite only has it in the message.
+        diag = getattr(exc.__cause__, "diag", None)
+        constraint = getattr(diag, "constraint_name", None)
+        if constraint is not None:
+            return constraint in (self.name_constraint, f"{table}_name_key")
+        message = str(exc)
+        return self.name_constraint in message or f"{table}.name" in message
+
+
+class BrandSerializer(UniqueNameMixin, ValuesRowsMixin, CachedFieldsSerializer):
+    duplicate_name_message = "Brand with this name already exists."
+    name_constraint = "brand_name_ci_uniq"
 
-class BrandSerializer(serializers.ModelSerializer):
     class Meta:
         model = Brand
         fields = ["id", "name", "slug"]
+        extra_kwargs = {"name": {"validators": []}}
 
-    def validate_name(self, value):
-        """Ensure brand name is unique (API-friendly error message)."""
-        if Brand.objects.filter(name__iexact=value).exists():
-            raise serializers.ValidationError("Brand with this name already exists.")
-        return value
 
+class CategorySerializer(UniqueNameMixin, ValuesRowsMixin, CachedFieldsSerializer):
+    duplicate_name_message = "Category with this name already exists."
+    name_constraint = "category_name_ci_uniq"
 
-class CategorySerializer(serializers.ModelSerializer):
     class Meta:
         model = Category
         fields = ["id", "name", "slug"]
-
-    def validate_name(self, value):
-        """Ensure category name is unique (API-friendly error message)."""
-        if Category.objects.filter(name__iexact=value).exists():
-            raise serializers.ValidationError("Category with this name already exists.")
-        return value
+        extra_kwargs = {"name": {"validators": []}}
 
 
-class ProductSerializer(serializers.ModelSerializer):
-    brand = BrandSerializer(read_only=True)
-    category = CategorySerializer(read_only=True)
+class ProductSerializer(ValuesRowsMixin, CachedFieldsSerializer):
+    brand_name = serializers.CharField(source="brand.name", read_only=True)
+    brand_slug = serializers.SlugField(source="brand.slug", read_only=True)
+    category_name = serializers.CharField(source="category.name", read_only=True)
+    category_slug = serializers.SlugField(source="category.slug", read_only=True)
 
-    brand_id = serializers.PrimaryKeyRelatedField(
-        queryset=Brand.objects.all(), source="brand", write_only=True
-    )
-    category_id = serializers.PrimaryKeyRelatedField(
-        queryset=Category.objects.all(), source="category", write_only=True
-    )
+    # Plain ids instead of PrimaryKeyRelatedField: no relation machinery or
+    # queryset is built on read requests, and writes only run an EXISTS.
+    brand_id = serializers.IntegerField(write_only=True)
+    category_id = serializers.IntegerField(write_only=True)
 
     class Meta:
         model = Product
@@ -44,8 +172,10 @@ class ProductSerializer(serializers.ModelSerializer):
             "id",
             "name",
             "slug",
-            "brand",
-            "category",
+            "brand_name",
+            "brand_slug",
+            "category_name",
+            "category_slug",
             "brand_id",
             "category_id",
             "description",
@@ -56,18 +186,27 @@ class ProductSerializer(serializers.ModelSerializer):
             "created_at",
             "updated_at",
         ]
+        # Bounds come from the model validators (min_value/max_value on the
+        # generated fields); only the messages are customised.
+        extra_kwargs = {
+            "price": {"error_messages": {"min_value": "Price must be at least 0.01."}},
+            "rating": {
+                "error_messages": {
+                    "min_value": "Rating must be between 0 and 5.",
+                    "max_value": "Rating must be between 0 and 5.",
+                }
+            },
+        }
 
     # FIELD LEVEL VALIDATIONS
-    def validate_price(self, value):
-        """Price must always be >= 0.01"""
-        if value < 0.01:
-            raise serializers.ValidationError("Price must be at least 0.01.")
+    def validate_brand_id(self, value):
+        if not Brand.objects.filter(pk=value).exists():
+            raise serializers.ValidationError(INVALID_PK_MESSAGE.format(pk=value))
         return value
 
-    def validate_rating(self, value):
-        """Rating must be between 0 and 5"""
-        if value < 0 or value > 5:
-            raise serializers.ValidationError("Rating must be between 0 and 5.")
+    def validate_category_id(self, value):
+        if not Category.objects.filter(pk=value).exists():
+            raise serializers.ValidationError(INVALID_PK_MESSAGE.format(pk=value))
         return value
 
     # OBJECT LEVEL VALIDATIONS
@@ -83,29 +222,71 @@ class ProductSerializer(serializers.ModelSerializer):
         return data
 
 
-class CartItemSerializer(serializers.ModelSerializer):
+class ProductListSerializer(ProductSerializer):
+    """Compact product representation for list endpoints."""
+
+    class Meta(ProductSerializer.Meta):
+        fields = [
+            "id",
+            "name",
+            "slug",
+            "brand_name",
+            "brand_slug",
+            "category_name",
+            "category_slug",
+            "brand_id",
+            "category_id",
+            "price",
+            "rating",
+            "in_stock",
+            "image_url",
+            "created_at",
+        ]
+
+
+class CartItemSerializer(ValuesRowsMixin, CachedFieldsSerializer):
     product = ProductSerializer(read_only=True)
-    product_id = serializers.PrimaryKeyRelatedField(
-        queryset=Product.objects.all(), source="product", write_only=True
-    )
+    product_id = serializers.IntegerField(write_only=True)
 
     class Meta:
         model = CartItem
         fields = ["id", "product", "product_id", "quantity", "added_at"]
-
-    # FIELD LEVEL VALIDATIONS
-    def validate_quantity(self, value):
-        """Quantity must always be >= 1"""
-        if value < 1:
-            raise serializers.ValidationError("Quantity must be at least 1.")
-        return value
+        extra_kwargs = {
+            "quantity": {
+                "error_messages": {"min_value": "Quantity must be at least 1."}
+            }
+        }
 
     # OBJECT LEVEL VALIDATIONS
     def validate(self, data):
-        """Check product stock before adding to cart"""
-        product = data.get("product")
-        if product and not product.in_stock:
+        """Resolve the product and check its stock before adding to cart"""
+        product_id = data.pop("product_id")
+        product = (
+            Product.objects.select_related("brand", "category")
+            .filter(pk=product_id)
+            .first()
+        )
+        if product is None:
+            raise serializers.ValidationError(
+                {"product_id": INVALID_PK_MESSAGE.format(pk=product_id)}
+            )
+        data["product"] = product
+        if not product.in_stock:
             raise serializers.ValidationError(
                 {"product": f"Product '{product.name}' is out of stock."}
             )
         return data
+
+
+class CartItemRefSerializer(serializers.Serializer):
+    """Validates the cart item id sent to CartView.delete()."""
+
+    id = serializers.IntegerField()
+
+
+class CartItemUpdateSerializer(CartItemRefSerializer):
+    """Validates a ``{id, quantity}`` change sent to CartView.patch()."""
+
+    quantity = serializers.IntegerField(
+        min_value=1, error_messages={"min_value": "Quantity must be at least 1."}
+    )
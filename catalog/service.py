@@ -1,37 +1,97 @@
-from django.db.models import Q
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.core.cache import cache
+from django.db import IntegrityError, connection, connections, transaction
+from django.db.models import Case, F, PositiveIntegerField, Q, Value, When
+
+from .models import SEARCH_CONFIG, Brand, CartItem, Category, Product
+
+_TRUTHY = frozenset({"true", "1", "yes", "t", "on"})
+
+# Columns rendered by ProductListSerializer; the rest (description...) is deferred.
+PRODUCT_LIST_FIELDS = (
+    "id",
+    "name",
+    "slug",
+    "price",
+    "rating",
+    "in_stock",
+    "image_url",
+    "created_at",
+    "brand__name",
+    "brand__slug",
+    "category__name",
+    "category__slug",
+)
+
+# ProductSerializer additionally renders the long text and modification time.
+PRODUCT_DETAIL_FIELDS = PRODUCT_LIST_FIELDS + ("description", "updated_at")
+
+
+def parse_bool(value):
+    """Interpret a query-string flag such as ``?in_stock=yes``."""
+    if isinstance(value, bool):
+        return value
+    return value.strip().lower() in _TRUTHY
+
+
+def search_condition(search):
+    # trgm_icontains is a plain ILIKE on PostgreSQL (see lookups.py), so the
+    # pg_trgm indexes on name/description serve the substring match.
+    condition = Q(name__trgm_icontains=search) | Q(description__trgm_icontains=search)
+    if connection.vendor == "postgresql":
+        # Whole words hit the search_vector GIN index; with every branch of
+        # the OR indexed, the planner can combine them in a BitmapOr.
+        condition |= Q(search_vector=SearchQuery(search, config=SEARCH_CONFIG))
+    return condition
+
+
+def search_products(queryset, search):
+    """Filter by ``search``; on PostgreSQL also order by weighted relevance."""
+    queryset = queryset.filter(search_condition(search))
+    if connection.vendor == "postgresql":
+        query = SearchQuery(search, config=SEARCH_CONFIG)
+        queryset = queryset.annotate(
+            rank=SearchRank(F("search_vector"), query)
+        ).order_by("-rank", "-created_at")
+    return queryset
 
-from .models import Brand, CartItem, Category, Product
 
+def get_products():
+    # Filtering, searching and ordering are applied by the view's
+    # filter backends (see filters.py).
+    return Product.objects.select_related("brand", "category").only(
+        *PRODUCT_LIST_FIELDS
+    )
 
-def get_products(filters):
-    queryset = Product.objects.all().select_related("brand", "category")
 
-    # Filtering
-    if filters.get("brand"):
-        queryset = queryset.filter(brand=filters["brand"])
-    if filters.get("category"):
-        queryset = queryset.filter(category=filters["category"])
-    if filters.get("in_stock") is not None:
-        queryset = queryset.filter(
-            in_stock=filters["in_stock"].lower() in ["true", "1"]
-        )
-    if filters.get("min_price"):
-        queryset = queryset.filter(price__gte=filters["min_price"])
-    if filters.get("max_price"):
-        queryset = queryset.filter(price__lte=filters["max_price"])
-
-    # Searching
-    if filters.get("search"):
-        search = filters["search"]
-        queryset = queryset.filter(
-            Q(name__icontains=search) | Q(description__icontains=search)
-        )
+def estimate_count(queryset):
+    """
+    The planner's row estimate for ``queryset`` from ``EXPLAIN``, or None on
+    backends other than PostgreSQL.
+    """
+    db = connections[queryset.db]
+    if db.vendor != "postgresql":
+        return None
+    sql, params = queryset.order_by().query.sql_with_params()
+    with db.cursor() as cursor:
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+        plan = cursor.fetchone()[0]
+    return int(plan[0]["Plan"]["Plan Rows"])
 
-    # Ordering
-    if filters.get("ordering"):
-        queryset = queryset.order_by(filters["ordering"])
 
-    return queryset
+def create_product(validated_data):
+    return Product.objects.create(**validated_data)
+
+
+def get_product_by_slug(slug):
+    """The product with ``slug``, or None."""
+    return (
+        Product.objects.select_related("brand", "category")
+        .only(*PRODUCT_DETAIL_FIELDS)
+        .filter(slug=slug)
+        .first()
+    )
 
 
 # Brand / category
@@ -47,57 +107,124 @@ def get_categories():
 
 # cart items
 
+# Most anonymous carts are empty; remember that to skip the query on GET.
+# Only with a shared cache: add_to_cart must reach every worker's marker.
+CART_EMPTY_TIMEOUT = 300
 
-# get cart items
-def get_cart_items(request):
+
+def _cart_owner(request):
+    """Lookup identifying the caller's cart rows, or None without a session."""
     if request.user.is_authenticated:
-        return CartItem.objects.filter(user=request.user).select_related("product")
-    else:
-        if not request.session.session_key:
-            request.session.create()
-        return CartItem.objects.filter(
-            session_id=request.session.session_key
-        ).select_related("product")
+        return {"user": request.user}
+    session_key = request.session.session_key
+    if session_key:
+        return {"session_id": session_key}
+    return None
 
 
-def add_to_cart(request, product, quantity):
-    if request.user.is_authenticated:
-        cart_item, created = CartItem.objects.get_or_create(
-            user=request.user,
-            product=product,
-            defaults={"quantity": quantity},
-        )
-    else:
-        if not request.session.session_key:
-            request.session.create()
-        cart_item, created = CartItem.objects.get_or_create(
-            session_id=request.session.session_key,
-            product=product,
-            defaults={"quantity": quantity},
+def _cart_empty_key(owner):
+    if owner is None or not settings.CACHE_IS_SHARED:
+        return None
+    if "user" in owner:
+        return f"cart_empty:user:{owner['user'].pk}"
+    return f"cart_empty:session:{owner['session_id']}"
+
+
+def is_cart_known_empty(request):
+    key = _cart_empty_key(_cart_owner(request))
+    return key is not None and cache.get(key) is True
+
+
+def remember_empty_cart(request):
+    key = _cart_empty_key(_cart_owner(request))
+    if key is not None:
+        # add(), not set(): a read that saw the cart empty just before an
+        # add_to_cart committed must not overwrite its "not empty" marker.
+        cache.add(key, True, CART_EMPTY_TIMEOUT)
+
+
+def _forget_empty_cart(owner):
+    key = _cart_empty_key(owner)
+    if key is not None:
+        transaction.on_commit(
+            lambda: cache.set(key, False, CART_EMPTY_TIMEOUT), robust=True
         )
-    if not created:
-        cart_item.quantity += quantity
-        cart_item.save()
-    return cart_item
 
 
-def update_cart_item(request, item_id, quantity):
-    item = get_cart_items(request).get(pk=item_id)
-    item.quantity = quantity
-    item.save()
-    return item
+# get cart items
+def get_cart_items(request):
+    owner = _cart_owner(request)
+    # Only add_to_cart creates a session; without one the cart is empty.
+    if owner is None:
+        return CartItem.objects.none()
+    return CartItem.objects.filter(**owner).select_related(
+        "product", "product__brand", "product__category"
+    )
+
+
+def add_to_cart(request, product, quantity):
+    owner = _cart_owner(request)
+    if owner is None:
+        request.session.create()
+        owner = {"session_id": request.session.session_key}
+    items = CartItem.objects.filter(product=product, **owner)
+    item = None
+    # Increment in SQL; the unique_user_product / unique_session_product
+    # constraints guarantee at most one row matches.
+    if not items.update(quantity=F("quantity") + quantity):
+        try:
+            with transaction.atomic():
+                item = CartItem.objects.create(
+                    product=product, quantity=quantity, **owner
+                )
+        except IntegrityError:
+            # A concurrent request inserted the row first; add to it instead.
+            items.update(quantity=F("quantity") + quantity)
+    # After the write, so a concurrent GET cannot re-mark the cart empty.
+    _forget_empty_cart(owner)
+    if item is not None:
+        return item
+    return items.select_related("product__brand", "product__category").get()
+
+
+# The update/delete helpers take the caller's cart (get_cart_items()) so a
+# view can build it once per request.
+
+
+def update_cart_item(items, item_id, quantity):
+    return items.filter(pk=item_id).update(quantity=quantity)
+
+
+def update_cart_items(items, quantities):
+    """
+    Apply ``{item_id: quantity}`` in one ``UPDATE ... SET quantity = CASE``.
+
+    All or nothing: if any id is not in the caller's cart the update is rolled
+    back and 0 is returned.
+    """
+    whens = [When(pk=pk, then=Value(quantity)) for pk, quantity in quantities.items()]
+    with transaction.atomic():
+        updated = items.filter(pk__in=quantities).update(
+            quantity=Case(*whens, output_field=PositiveIntegerField())
+        )
+        if updated != len(quantities):
+            transaction.set_rollback(True)
+            return 0
+    return updated
 
 
-def delete_cart_item(request, item_id):
-    item = get_cart_items(request).get(pk=item_id)
-    item.delete()
-    return True
+def delete_cart_item(items, item_id):
+    deleted, _ = items.filter(pk=item_id).delete()
+    return deleted > 0
 
 
 def clear_cart(request):
-    items = CartItem.objects.all()
-    if request.user.is_authenticated:
-        items = items.filter(user=request.user)
-    else:
-        items = items.filter(session_id=request.session.session_key)
-    items.delete()
+    owner = _cart_owner(request)
+    if owner is None:
+        return 0
+    items = CartItem.objects.filter(**owner)
+    # Nothing references CartItem and no delete signals are hooked, so skip
+    # the collector and issue a single DELETE ... WHERE.
+    deleted = items._raw_delete(items.db)
+    remember_empty_cart(request)
+    return deleted
@@ -0,0 +1,23 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import caching
+from .models import Brand, Category, Product
+
+
+@receiver([post_save, post_delete], sender=Product)
+def invalidate_product_caches(sender, **kwargs):
+    caching.bump_version("products")
+
+
+@receiver([post_save, post_delete], sender=Brand)
+def invalidate_brand_caches(sender, **kwargs):
+    caching.bump_version("brands")
+    # Product pages embed the brand name and slug.
+    caching.bump_version("products")
+
+
+@receiver([post_save, post_delete], sender=Category)
+def invalidate_category_caches(sender, **kwargs):
+    caching.bump_version("categories")
+    caching.bump_version("products")
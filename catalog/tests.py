@@ -1,13 +1,32 @@
+import json
+from decimal import Decimal
+from unittest import mock
+
+from django.conf import settings
 from django.contrib.auth.models import User
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.db import IntegrityError
+from django.db.models import QuerySet
+from django.http import StreamingHttpResponse
+from django.test import SimpleTestCase, override_settings
 from django.urls import reverse
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
 from rest_framework import status
+from rest_framework.exceptions import ValidationError
+from rest_framework.renderers import JSONRenderer
 from rest_framework.test import APIClient, APITestCase
 
-from .models import Brand, Category
+from . import service, views
+from .models import Brand, CartItem, Category, Product, generate_unique_slug
+from .renderers import ORJSONRenderer
+from .serializers import BrandSerializer, CartItemSerializer, ProductListSerializer
 
 
 class ProductAPITestCase(APITestCase):
     def setUp(self):
+        cache.clear()
         self.admin_user = User.objects.create_superuser(
             username="admin", email="admin@example.com", password="adminpass"
         )
@@ -34,3 +53,647 @@ class ProductAPITestCase(APITestCase):
         }
         response = self.client.post(url, data, format="json")
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data["data"]["brand_name"], "TestBrand")
+        self.assertEqual(response.data["data"]["slug"], "test-product")
+
+    def test_list_products_uses_constant_queries(self):
+        for i in range(3):
+            Product.objects.create(
+                name=f"Product {i}",
+                brand=self.brand,
+                category=self.category,
+                description="Long description",
+                price="10.00",
+            )
+        # One COUNT for the paginator and one SELECT for the page.
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse("product-list"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["status_code"], 200)
+        self.assertIsNone(response.data["errors"])
+        results = response.data["data"]["results"]
+        self.assertEqual(len(results), 3)
+        self.assertEqual(results[0]["brand_name"], "TestBrand")
+        self.assertNotIn("description", results[0])
+
+    def test_list_rows_match_serializer_output(self):
+        product = Product.objects.create(
+            name="Projected",
+            brand=self.brand,
+            category=self.category,
+            price="12.50",
+            rating="4.25",
+            image_url="http://example.com/p.png",
+        )
+        response = self.client.get(reverse("product-list"))
+        expected = ProductListSerializer(product).data
+        self.assertEqual(response.json()["data"]["results"], [expected])
+
+    def test_list_filters_search_and_ordering(self):
+        other = Brand.objects.create(name="OtherBrand")
+        for name, brand, price in [
+            ("Blue Kettle", self.brand, "30.00"),
+            ("Red Kettle", self.brand, "20.00"),
+            ("Blue Mug", other, "5.00"),
+        ]:
+            Product.objects.create(
+                name=name, brand=brand, category=self.category, price=price
+            )
+        response = self.client.get(
+            reverse("product-list"),
+            {"brand": self.brand.id, "search": "kettle", "ordering": "price"},
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        names = [p["name"] for p in response.data["data"]["results"]]
+        self.assertEqual(names, ["Red Kettle", "Blue Kettle"])
+
+    def test_in_stock_filter_accepts_common_flag_spellings(self):
+        Product.objects.create(
+            name="Stocked", brand=self.brand, category=self.category, price="1.00"
+        )
+        Product.objects.create(
+            name="Sold out",
+            brand=self.brand,
+            category=self.category,
+            price="1.00",
+            in_stock=False,
+        )
+        url = reverse("product-list")
+        for value, expected in [
+            ("1", "Stocked"),
+            ("TRUE", "Stocked"),
+            ("yes", "Stocked"),
+            ("0", "Sold out"),
+        ]:
+            response = self.client.get(url, {"in_stock": value})
+            names = [p["name"] for p in response.data["data"]["results"]]
+            self.assertEqual(names, [expected], value)
+
+    def test_price_filters_accept_zero_and_reject_garbage(self):
+        for price in ("0.50", "5.00", "50.00"):
+            Product.objects.create(
+                name=f"Priced {price}",
+                brand=self.brand,
+                category=self.category,
+                price=price,
+            )
+        url = reverse("product-list")
+        response = self.client.get(url, {"min_price": "0", "max_price": "5"})
+        self.assertEqual(response.data["data"]["count"], 2)
+
+        response = self.client.get(url, {"min_price": "cheap"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data["status_code"], 400)
+        self.assertEqual(response.data["message"], "Validation error")
+        self.assertIsNone(response.data["data"])
+        self.assertIn("min_price", response.data["errors"])
+
+    def test_detail_loads_only_serialized_columns_in_one_query(self):
+        product = Product.objects.create(
+            name="Detailed",
+            brand=self.brand,
+            category=self.category,
+            description="Full text",
+            price="5.00",
+        )
+        # A serializer field missing from the .only() list would add a query.
+        with self.assertNumQueries(1):
+            response = self.client.get(
+                reverse("product-detail", kwargs={"slug": product.slug})
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["data"]["description"], "Full text")
+        self.assertEqual(response.data["data"]["category_slug"], "testcategory")
+
+        response = self.client.get(
+            reverse("product-detail", kwargs={"slug": "no-such-product"})
+        )
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_cursor_pages_walk_the_catalog_without_counting(self):
+        for i in range(12):
+            Product.objects.create(
+                name=f"Keyset {i}",
+                brand=self.brand,
+                category=self.category,
+                price="1.00",
+            )
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse("product-list"), {"cursor": ""})
+        first = response.data["data"]
+        self.assertNotIn("count", first)
+        self.assertEqual(len(first["results"]), 10)
+        self.assertIsNone(first["previous"])
+
+        second = self.client.get(first["next"]).data["data"]
+        self.assertEqual(len(second["results"]), 2)
+        names = {p["name"] for p in first["results"] + second["results"]}
+        self.assertEqual(len(names), 12)
+
+    def test_cursor_pages_keep_rows_with_tied_timestamps(self):
+        for i in range(15):
+            Product.objects.create(
+                name=f"Tied {i}",
+                brand=self.brand,
+                category=self.category,
+                price="1.00",
+            )
+        Product.objects.update(created_at=timezone.now())
+        first = self.client.get(reverse("product-list"), {"cursor": ""}).data["data"]
+        second = self.client.get(first["next"]).data["data"]
+        names = {p["name"] for p in first["results"] + second["results"]}
+        self.assertEqual(len(names), 15)
+
+    @override_settings(CACHE_IS_SHARED=True)
+    def test_list_pages_are_cached_until_a_brand_is_renamed(self):
+        Product.objects.create(
+            name="Cached", brand=self.brand, category=self.category, price="2.00"
+        )
+        url = reverse("product-list")
+        self.client.get(url, {"ordering": "-price"})
+        with self.assertNumQueries(0):
+            response = self.client.get(url, {"ordering": "-price"})
+        self.assertEqual(response.data["data"]["results"][0]["name"], "Cached")
+
+        self.brand.name = "RenamedBrand"
+        self.brand.save()
+        response = self.client.get(url, {"ordering": "-price"})
+        self.assertEqual(
+            response.data["data"]["results"][0]["brand_name"], "RenamedBrand"
+        )
+
+    def test_export_streams_filtered_products_as_ndjson(self):
+        for i in range(3):
+            Product.objects.create(
+                name=f"Exported {i}",
+                brand=self.brand,
+                category=self.category,
+                price="4.00",
+                in_stock=i != 0,
+            )
+        response = self.client.get(reverse("product-export"), {"in_stock": "true"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        lines = b"".join(response.streaming_content).splitlines()
+        rows = [json.loads(line) for line in lines]
+        self.assertEqual(len(rows), 2)
+        self.assertTrue(all(row["in_stock"] for row in rows))
+
+        self.client.force_authenticate(user=None)
+        response = self.client.get(reverse("product-export"))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        response = self.client.get(reverse("product-list"), {"stream": "1"})
+        self.assertNotIsInstance(response, StreamingHttpResponse)
+
+    def test_export_route_does_not_shadow_a_product_slug(self):
+        Product.objects.create(
+            name="Export", brand=self.brand, category=self.category, price="1.00"
+        )
+        url = reverse("product-detail", kwargs={"slug": "export"})
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["data"]["name"], "Export")
+
+    def test_list_pages_are_not_cached_in_a_per_process_cache(self):
+        Product.objects.create(
+            name="Fresh", brand=self.brand, category=self.category, price="1.00"
+        )
+        url = reverse("product-list")
+        self.client.get(url)
+        # The COUNT and the page SELECT run again; no ETag is offered.
+        with self.assertNumQueries(2):
+            response = self.client.get(url)
+        self.assertNotIn("ETag", response)
+
+    @override_settings(CACHE_IS_SHARED=True)
+    def test_list_count_is_cached_until_products_change(self):
+        Product.objects.create(
+            name="Counted", brand=self.brand, category=self.category, price="1.00"
+        )
+        url = reverse("product-list")
+        self.client.get(url)
+        # Only the page SELECT; the COUNT comes from the cache.
+        with self.assertNumQueries(1):
+            response = self.client.get(url, {"page_size": 5})
+        self.assertEqual(response.data["data"]["count"], 1)
+
+        Product.objects.create(
+            name="Counted 2", brand=self.brand, category=self.category, price="1.00"
+        )
+        response = self.client.get(url)
+        self.assertEqual(response.data["data"]["count"], 2)
+
+    def test_large_result_sets_use_the_planner_estimate(self):
+        url = reverse("product-list")
+        with mock.patch("catalog.service.estimate_count", return_value=25000):
+            response = self.client.get(url)
+        self.assertEqual(response.data["data"]["count"], 25000)
+        self.assertTrue(response.data["data"]["count_estimated"])
+
+        with mock.patch("catalog.service.estimate_count", return_value=40):
+            response = self.client.get(url, {"in_stock": "true"})
+        self.assertEqual(response.data["data"]["count"], 0)
+        self.assertFalse(response.data["data"]["count_estimated"])
+
+
+class TrigramLookupTestCase(SimpleTestCase):
+    def test_postgresql_sql_is_a_bare_ilike_on_the_column(self):
+        queryset = Product.objects.filter(name__trgm_icontains="50%")
+        compiler = queryset.query.get_compiler(using="default")
+        lookup = queryset.query.where.children[0]
+        sql, params = lookup.as_postgresql(compiler, compiler.connection)
+        self.assertEqual(sql, '"catalog_product"."name" ILIKE %s')
+        self.assertEqual(params, ("%50\\%%",))
+
+
+class ORJSONRendererTestCase(SimpleTestCase):
+    def test_output_matches_drf_json_renderer(self):
+        data = {"price": Decimal("9.99"), "label": gettext_lazy("Cart cleared")}
+        self.assertEqual(
+            json.loads(ORJSONRenderer().render(data)),
+            json.loads(JSONRenderer().render(data)),
+        )
+
+    def test_non_string_keys_are_stringified(self):
+        data = {1: "a", None: "b"}
+        self.assertEqual(ORJSONRenderer().render(data), JSONRenderer().render(data))
+
+
+class SlugGenerationTestCase(APITestCase):
+    def test_colliding_names_get_numbered_slugs(self):
+        first = Brand.objects.create(name="Acme")
+        second = Brand(name="ACME!")
+        second.save()
+        third = Brand(name="acme?")
+        third.save()
+        self.assertEqual(first.slug, "acme")
+        self.assertEqual(second.slug, "acme-1")
+        self.assertEqual(third.slug, "acme-2")
+
+    def test_slug_lookup_is_a_single_query(self):
+        for i in range(5):
+            Category.objects.create(name=f"Shoes {i}", slug=f"shoes-{i}")
+        Category.objects.create(name="Shoes", slug="shoes")
+        category = Category(name="SHOES.")
+        with self.assertNumQueries(1):
+            category.slug = generate_unique_slug(category, category.name)
+        self.assertEqual(category.slug, "shoes-5")
+
+
+class UniqueNameTestCase(APITestCase):
+    def test_duplicate_name_differing_in_case_is_rejected(self):
+        Brand.objects.create(name="Nosteza")
+        serializer = BrandSerializer(data={"name": "NOSTEZA"})
+        self.assertTrue(serializer.is_valid())
+        with self.assertRaises(ValidationError) as ctx:
+            serializer.save()
+        self.assertEqual(
+            ctx.exception.detail["name"], "Brand with this name already exists."
+        )
+        self.assertEqual(Brand.objects.count(), 1)
+
+    def test_slug_collision_is_not_reported_as_a_duplicate_name(self):
+        Brand.objects.create(name="Original", slug="taken")
+        serializer = BrandSerializer(data={"name": "Different"})
+        self.assertTrue(serializer.is_valid())
+        with mock.patch(
+            "catalog.models.generate_unique_slug", return_value="taken"
+        ), self.assertRaises(IntegrityError):
+            serializer.save()
+
+
+@override_settings(CACHE_IS_SHARED=True)
+class BrandListCacheTestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_brand_pages_are_cached_until_a_brand_changes(self):
+        Brand.objects.create(name="Acme")
+        url = reverse("brand-list")
+        self.client.get(url)
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertEqual(response.data["data"]["count"], 1)
+
+        Brand.objects.create(name="Globex")
+        response = self.client.get(url)
+        self.assertEqual(response.data["data"]["count"], 2)
+        expected = BrandSerializer(Brand.objects.all(), many=True).data
+        self.assertEqual(response.json()["data"]["results"], expected)
+
+    def test_brand_count_is_shared_between_pages(self):
+        Brand.objects.bulk_create(Brand(name=f"B{i}", slug=f"b{i}") for i in range(12))
+        url = reverse("brand-list")
+        self.client.get(url)
+        with self.assertNumQueries(1):
+            response = self.client.get(url, {"page": 2})
+        self.assertEqual(response.data["data"]["count"], 12)
+        self.assertEqual(len(response.data["data"]["results"]), 2)
+
+    def test_brand_pages_are_served_from_process_memory(self):
+        Brand.objects.create(name="Umbrella")
+        url = reverse("brand-list")
+        self.client.get(url)
+        with mock.patch.object(cache, "get", wraps=cache.get) as shared_get:
+            response = self.client.get(url)
+        keys = [call.args[0] for call in shared_get.call_args_list]
+        self.assertFalse([key for key in keys if ":page:" in key])
+        self.assertEqual(response.data["data"]["count"], 1)
+
+    def test_unchanged_brand_list_answers_conditional_get_with_304(self):
+        Brand.objects.create(name="Initech")
+        url = reverse("brand-list")
+        response = self.client.get(url)
+        self.assertEqual(response["Cache-Control"], "public, max-age=300")
+        etag = response["ETag"]
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        Brand.objects.create(name="Hooli")
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response["ETag"], etag)
+
+
+class CartAPITestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="shopper", password="pass")
+        self.client.force_authenticate(user=self.user)
+        brand = Brand.objects.create(name="CartBrand")
+        category = Category.objects.create(name="CartCategory")
+        self.product = Product.objects.create(
+            name="Cart Product", brand=brand, category=category, price="5.00"
+        )
+
+    def test_adding_same_product_twice_increments_quantity(self):
+        url = reverse("cart")
+        self.client.post(url, {"product_id": self.product.id, "quantity": 2})
+        response = self.client.post(url, {"product_id": self.product.id, "quantity": 3})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data["data"]["quantity"], 5)
+        self.assertEqual(CartItem.objects.get(user=self.user).quantity, 5)
+
+    def test_insert_race_falls_back_to_increment(self):
+        CartItem.objects.create(user=self.user, product=self.product, quantity=2)
+        original_update = QuerySet.update
+        calls = []
+
+        def stale_first_update(queryset, **kwargs):
+            # Simulate the row appearing right after the first UPDATE ran.
+            calls.append(kwargs)
+            if len(calls) == 1:
+                return 0
+            return original_update(queryset, **kwargs)
+
+        with mock.patch.object(QuerySet, "update", stale_first_update):
+            response = self.client.post(
+                reverse("cart"), {"product_id": self.product.id, "quantity": 3}
+            )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data["data"]["quantity"], 5)
+        self.assertEqual(CartItem.objects.get(user=self.user).quantity, 5)
+
+    def test_adding_to_cart_does_not_lazy_load_the_product(self):
+        url = reverse("cart")
+        # Product lookup with brand/category, UPDATE, then SAVEPOINT/INSERT/RELEASE;
+        # the nested product in the response is rendered from the joined row.
+        with self.assertNumQueries(5):
+            self.client.post(url, {"product_id": self.product.id, "quantity": 1})
+        # Product lookup and UPDATE, then the joined re-read of the item.
+        with self.assertNumQueries(3):
+            response = self.client.post(
+                url, {"product_id": self.product.id, "quantity": 1}
+            )
+        self.assertEqual(response.data["data"]["product"]["brand_name"], "CartBrand")
+
+    def test_adding_unknown_product_is_rejected(self):
+        response = self.client.post(
+            reverse("cart"), {"product_id": 999999, "quantity": 1}
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("product_id", response.data["errors"])
+
+    def test_cart_listing_query_count_is_independent_of_size(self):
+        brand = Brand.objects.create(name="SecondBrand")
+        category = Category.objects.create(name="SecondCategory")
+        CartItem.objects.create(user=self.user, product=self.product)
+        for i in range(3):
+            product = Product.objects.create(
+                name=f"Extra {i}", brand=brand, category=category, price="2.00"
+            )
+            CartItem.objects.create(user=self.user, product=product)
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse("cart"))
+        self.assertEqual(len(response.data["data"]), 4)
+        expected = CartItemSerializer(
+            CartItem.objects.filter(user=self.user), many=True
+        ).data
+        self.assertEqual(response.json()["data"], expected)
+        product_data = response.data["data"][0]["product"]
+        self.assertEqual(product_data["brand_name"], "SecondBrand")
+
+    def test_update_and_delete_cart_item_are_single_queries(self):
+        item = CartItem.objects.create(user=self.user, product=self.product)
+        url = reverse("cart")
+        with self.assertNumQueries(1):
+            response = self.client.patch(url, {"id": item.id, "quantity": 4})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(CartItem.objects.get(pk=item.pk).quantity, 4)
+
+        with self.assertNumQueries(1):
+            response = self.client.delete(url, {"id": item.id})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = self.client.delete(url, {"id": item.id})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_several_quantities_are_updated_in_one_statement(self):
+        other_product = Product.objects.create(
+            name="Second",
+            brand=self.product.brand,
+            category=self.product.category,
+            price="1.00",
+        )
+        first = CartItem.objects.create(user=self.user, product=self.product)
+        second = CartItem.objects.create(user=self.user, product=other_product)
+        changes = [{"id": first.id, "quantity": 3}, {"id": second.id, "quantity": 7}]
+        # SAVEPOINT, UPDATE, RELEASE SAVEPOINT inside the test transaction.
+        with self.assertNumQueries(3):
+            response = self.client.patch(reverse("cart"), changes, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(CartItem.objects.get(pk=first.pk).quantity, 3)
+        self.assertEqual(CartItem.objects.get(pk=second.pk).quantity, 7)
+
+        changes = [{"id": first.id, "quantity": 9}, {"id": 999999, "quantity": 1}]
+        response = self.client.patch(reverse("cart"), changes, format="json")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(CartItem.objects.get(pk=first.pk).quantity, 3)
+
+    def test_cart_items_can_be_addressed_by_url(self):
+        item = CartItem.objects.create(user=self.user, product=self.product)
+        url = reverse("cart-item", kwargs={"pk": item.pk})
+        response = self.client.patch(url, {"quantity": 6})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(CartItem.objects.get(pk=item.pk).quantity, 6)
+
+        response = self.client.delete(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(CartItem.objects.filter(pk=item.pk).exists())
+
+    def test_non_object_bodies_on_item_urls_are_rejected(self):
+        item = CartItem.objects.create(user=self.user, product=self.product)
+        url = reverse("cart-item", kwargs={"pk": item.pk})
+        response = self.client.patch(url, [{"quantity": 2}], format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data["message"], "Validation error")
+
+        response = self.client.delete(url, "oops", format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertTrue(CartItem.objects.filter(pk=item.pk).exists())
+
+    def test_malformed_cart_item_changes_are_rejected(self):
+        url = reverse("cart")
+        response = self.client.patch(url, {"id": "abc", "quantity": 0})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(set(response.data["errors"]), {"id", "quantity"})
+
+        response = self.client.delete(url, {})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("id", response.data["errors"])
+
+    def test_clear_cart_only_removes_own_items(self):
+        other = User.objects.create_user(username="other", password="pass")
+        CartItem.objects.create(user=self.user, product=self.product)
+        CartItem.objects.create(user=other, product=self.product)
+        response = self.client.post(reverse("cart-clear"))
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(response.data["deleted"], 1)
+        self.assertFalse(CartItem.objects.filter(user=self.user).exists())
+        self.assertTrue(CartItem.objects.filter(user=other).exists())
+
+    @override_settings(CACHE_IS_SHARED=True)
+    def test_empty_cart_is_remembered_until_an_item_is_added(self):
+        url = reverse("cart")
+        self.client.get(url)
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertEqual(response.data["data"], [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(url, {"product_id": self.product.id, "quantity": 1})
+        response = self.client.get(url)
+        self.assertEqual(len(response.data["data"]), 1)
+
+    @override_settings(CACHE_IS_SHARED=True)
+    def test_stale_empty_read_cannot_hide_an_added_item(self):
+        url = reverse("cart")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(url, {"product_id": self.product.id, "quantity": 1})
+        # A GET that read the table before the insert committed.
+        request = mock.Mock(user=self.user)
+        service.remember_empty_cart(request)
+        response = self.client.get(url)
+        self.assertEqual(len(response.data["data"]), 1)
+
+    def test_empty_cart_is_not_remembered_in_a_per_process_cache(self):
+        url = reverse("cart")
+        self.client.get(url)
+        with self.assertNumQueries(1):
+            self.client.get(url)
+
+
+class StripeCheckoutTestCase(APITestCase):
+    def test_checkout_session_reads_only_the_priced_columns(self):
+        brand = Brand.objects.create(name="PayBrand")
+        category = Category.objects.create(name="PayCategory")
+        product = Product.objects.create(
+            name="Paid", brand=brand, category=category, price="12.34"
+        )
+        session = mock.Mock(id="cs_test", url="https://checkout.example.com")
+        url = reverse("create-checkout-session", kwargs={"pk": product.pk})
+        with mock.patch(
+            "stripe.checkout.Session.create", return_value=session
+        ) as create:
+            with self.assertNumQueries(1):
+                response = self.client.post(
+                    url,
+                    {"email": "buyer@example.com", "quantity": 2},
+                    format="json",
+                )
+        self.assertEqual(response.json(), {"sessionId": "cs_test", "url": session.url})
+        line_item = create.call_args.kwargs["line_items"][0]
+        self.assertEqual(line_item["price_data"]["unit_amount"], 1234)
+        self.assertEqual(line_item["quantity"], 2)
+
+    def test_checkout_uses_the_current_price(self):
+        brand = Brand.objects.create(name="FragBrand")
+        category = Category.objects.create(name="FragCategory")
+        product = Product.objects.create(
+            name="Frag", brand=brand, category=category, price="5.00"
+        )
+        url = reverse("create-checkout-session", kwargs={"pk": product.pk})
+        session = mock.Mock(id="cs_test", url="https://checkout.example.com")
+        with mock.patch(
+            "stripe.checkout.Session.create", return_value=session
+        ) as create:
+            self.client.post(url, {"email": "a@example.com"}, format="json")
+            product.price = "7.50"
+            product.save()
+            self.client.post(url, {"email": "a@example.com"}, format="json")
+        amounts = [
+            call.kwargs["line_items"][0]["price_data"]["unit_amount"]
+            for call in create.call_args_list
+        ]
+        self.assertEqual(amounts, [500, 750])
+
+
+class StripeWebhookTestCase(APITestCase):
+    def test_event_is_processed_before_acknowledging(self):
+        event = {
+            "type": "checkout.session.completed",
+            "data": {
+                "object": {"customer_email": "a@example.com", "amount_total": 500}
+            },
+        }
+        with mock.patch("stripe.Webhook.construct_event", return_value=event):
+            with self.assertLogs("catalog.views", level="INFO") as logs:
+                response = self.client.post(
+                    reverse("stripe_webhook"), b"{}", content_type="application/json"
+                )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn("a@example.com", logs.output[0])
+
+    def test_completed_checkout_is_logged(self):
+        with self.assertLogs("catalog.views", level="INFO") as logs:
+            views.process_stripe_event(
+                "checkout.session.completed",
+                {"customer_email": "a@example.com", "amount_total": 500},
+            )
+        self.assertIn("a@example.com", logs.output[0])
+
+
+class AnonymousCartTestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_clearing_without_a_session_deletes_nothing(self):
+        user = User.objects.create_user(username="owner", password="pass")
+        brand = Brand.objects.create(name="ClearBrand")
+        category = Category.objects.create(name="ClearCategory")
+        product = Product.objects.create(
+            name="Kept", brand=brand, category=category, price="1.00"
+        )
+        CartItem.objects.create(user=user, product=product)
+        with self.assertNumQueries(0):
+            response = self.client.post(reverse("cart-clear"))
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(response.data["deleted"], 0)
+        self.assertTrue(CartItem.objects.exists())
+
+    def test_reading_an_empty_cart_does_not_create_a_session(self):
+        response = self.client.get(reverse("cart"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["data"], [])
+        self.assertFalse(Session.objects.exists())
+        self.assertNotIn(settings.SESSION_COOKIE_NAME, response.cookies)
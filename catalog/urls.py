@@ -3,10 +3,10 @@ from rest_framework.authtoken.views import obtain_auth_token
 
 from .views import (
     BrandListView,
-    CartClearView,
-    CartView,
+    CartViewSet,
     CategoryListView,
     ProductDetailView,
+    ProductExportView,
     ProductListView,
     payment_cancel,
     payment_success,
@@ -14,13 +14,24 @@ from .views import (
     stripe_webhook,
 )
 
+cart = CartViewSet.as_view(
+    {"get": "list", "post": "create", "patch": "partial_update", "delete": "destroy"}
+)
+cart_item = CartViewSet.as_view(
+    {"patch": "partial_update_item", "delete": "destroy_item"}
+)
+cart_clear = CartViewSet.as_view({"post": "clear"})
+
 urlpatterns = [
     path("products/", ProductListView.as_view(), name="product-list"),
     path("products/<slug:slug>/", ProductDetailView.as_view(), name="product-detail"),
+    # Kept out of products/ so it can never shadow a product slug.
+    path("export/products/", ProductExportView.as_view(), name="product-export"),
     path("brands/", BrandListView.as_view(), name="brand-list"),
     path("categories/", CategoryListView.as_view(), name="category-list"),
-    path("cart/", CartView.as_view(), name="cart"),
-    path("cart/clear/", CartClearView.as_view(), name="cart-clear"),
+    path("cart/", cart, name="cart"),
+    path("cart/clear/", cart_clear, name="cart-clear"),
+    path("cart/<int:pk>/", cart_item, name="cart-item"),
     path("auth/token/", obtain_auth_token, name="api_token_auth"),
     path(
         "create-checkout-session/<int:pk>/",
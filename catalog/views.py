@@ -1,90 +1,301 @@
-import json
+import logging
+from collections.abc import Mapping
 
+import orjson
 import stripe
 from django.conf import settings
-from django.http import JsonResponse
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.http import JsonResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404, render
+from django.utils.cache import (
+    get_conditional_response,
+    patch_cache_control,
+    patch_vary_headers,
+)
+from django.utils.functional import cached_property
+from django.utils.http import http_date, quote_etag
 from django.views.decorators.csrf import csrf_exempt
 from drf_spectacular.utils import OpenApiParameter, OpenApiResponse, extend_schema
-from rest_framework import permissions, status
-from rest_framework.pagination import PageNumberPagination
+from rest_framework import permissions, status, viewsets
+from rest_framework.filters import OrderingFilter
+from rest_framework.generics import ListAPIView
+from rest_framework.pagination import CursorPagination, PageNumberPagination
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from . import service
+from . import caching, service
 from .Custom_response_helper import custom_response
+from .filters import (
+    InvalidFilters,
+    ProductFilter,
+    ProductFilterBackend,
+    ProductSearchFilter,
+)
 from .models import CartItem, Product
 from .serializers import (
     BrandSerializer,
+    CartItemRefSerializer,
     CartItemSerializer,
+    CartItemUpdateSerializer,
     CategorySerializer,
+    ProductListSerializer,
     ProductSerializer,
 )
 
+logger = logging.getLogger(__name__)
+
+# Configured once per process: the requests-based client keeps a keep-alive
+# session per thread, so repeat checkouts skip the TCP/TLS handshake.
+stripe.api_key = settings.STRIPE_SECRET_KEY
+stripe.default_http_client = stripe.RequestsClient()
+
 
 class CustomPagination(PageNumberPagination):
+    # page_size is always set, so list views never serialize a whole table.
     page_size = 10
     page_size_query_param = "page_size"
     max_page_size = 48
 
     def get_paginated_response(self, data):
-        return Response(
+        return custom_response(
+            200,
+            "Success",
             {
-                "status_code": 200,
-                "message": "Success",
-                "data": {
-                    "count": self.page.paginator.count,
-                    "next": self.get_next_link(),
-                    "previous": self.get_previous_link(),
-                    "results": data,
-                },
-            }
+                "count": self.page.paginator.count,
+                "next": self.get_next_link(),
+                "previous": self.get_previous_link(),
+                "results": data,
+            },
         )
 
 
+class CustomCursorPagination(CursorPagination):
+    """
+    Keyset pagination for deep product listings: no OFFSET scan and no COUNT,
+    so the envelope carries ``next``/``previous`` but not ``count``.
+    """
+
+    page_size = 10
+    page_size_query_param = "page_size"
+    max_page_size = 48
+    ordering = "-created_at"
+
+    def get_paginated_response(self, data):
+        return custom_response(
+            200,
+            "Success",
+            {
+                "next": self.get_next_link(),
+                "previous": self.get_previous_link(),
+                "results": data,
+            },
+        )
+
+
+class CachedCountPaginator(Paginator):
+    """
+    Django paginator whose COUNT(*) is shared through the cache.
+
+    With ``estimate_above`` set, the planner's estimate is used instead of a
+    real COUNT(*) whenever it exceeds that many rows.
+    """
+
+    def __init__(
+        self, object_list, per_page, cache_key, timeout, estimate_above=None, **kwargs
+    ):
+        super().__init__(object_list, per_page, **kwargs)
+        self.cache_key = cache_key
+        self.timeout = timeout
+        self.estimate_above = estimate_above
+
+    def compute_count(self):
+        if self.estimate_above is not None:
+            estimate = service.estimate_count(self.object_list)
+            if estimate is not None and estimate > self.estimate_above:
+                return estimate, True
+        return self.object_list.count(), False
+
+    @cached_property
+    def counted(self):
+        if not settings.CACHE_IS_SHARED:
+            # Same reason as CachedPageMixin: per-worker versions go stale.
+            return self.compute_count()
+        return cache.get_or_set(self.cache_key, self.compute_count, self.timeout)
+
+    @cached_property
+    def count(self):
+        return self.counted[0]
+
+    @property
+    def count_is_estimate(self):
+        return self.counted[1]
+
+
+class CachedCountPagination(CustomPagination):
+    """
+    Reuses the COUNT(*) for every page of the same filter combination; the key
+    is versioned under the view's cache_namespace, so writes to the model
+    invalidate it (see signals.py).
+    """
+
+    count_timeout = 5 * 60
+    # Row count above which an EXPLAIN estimate replaces COUNT(*) (None: never).
+    estimate_count_above = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.count_cache_key = caching.make_key(
+            view.cache_namespace,
+            "count",
+            request.query_params,
+            exclude=(self.page_query_param, self.page_size_query_param),
+        )
+        return super().paginate_queryset(queryset, request, view)
+
+    def django_paginator_class(self, object_list, per_page):
+        return CachedCountPaginator(
+            object_list,
+            per_page,
+            self.count_cache_key,
+            self.count_timeout,
+            estimate_above=self.estimate_count_above,
+        )
+
+    def get_paginated_response(self, data):
+        response = super().get_paginated_response(data)
+        if self.estimate_count_above is not None:
+            # Lets clients render "about N results" for estimated counts.
+            response.data["data"][
+                "count_estimated"
+            ] = self.page.paginator.count_is_estimate
+        return response
+
+
+class EstimatedCountPagination(CachedCountPagination):
+    estimate_count_above = 1000
+
+
+class CachedPageMixin:
+    """
+    Serve rendered list pages from the cache, keyed by the query string.
+
+    Keys are versioned per namespace and the version is bumped by the model's
+    save/delete signals (see signals.py), so a write invalidates every page.
+    The key doubles as the ETag and the version (a timestamp) as
+    Last-Modified, so conditional GETs are answered without any query.
+    All of this needs a shared cache (settings.CACHE_IS_SHARED); otherwise
+    every request is rendered from the database.
+    """
+
+    cache_namespace = None
+    cache_timeout = 60 * 60
+    # Also keep pages in process memory; for small lookup tables.
+    local_cache = False
+    # Let browsers and shared caches reuse the page for this many seconds.
+    cache_max_age = None
+
+    def get_cached_page(self, request):
+        if not settings.CACHE_IS_SHARED:
+            # Versions bumped in one worker's LocMemCache are invisible to the
+            # others, which would keep serving (and 304-ing) stale pages.
+            return self.patch_client_caching(self.list(request))
+        namespace = self.cache_namespace
+        version = caching.get_version(namespace)
+        key = caching.make_key(namespace, "page", request.query_params)
+        etag = quote_etag(key)
+        last_modified = version // 10**9
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is None:
+            data = None
+            if self.local_cache:
+                data = caching.get_local(namespace, version, key)
+            if data is None:
+                data = cache.get(key)
+            if data is None:
+                response = self.list(request)
+                data = response.data
+                cache.set(key, data, self.cache_timeout)
+            else:
+                response = Response(data)
+            if self.local_cache:
+                caching.set_local(namespace, version, key, data)
+        response["ETag"] = etag
+        response["Last-Modified"] = http_date(last_modified)
+        return self.patch_client_caching(response)
+
+    def patch_client_caching(self, response):
+        if self.cache_max_age is not None:
+            patch_cache_control(response, public=True, max_age=self.cache_max_age)
+            # The browsable API and JSON renderings share a URL.
+            patch_vary_headers(response, ["Accept"])
+        return response
+
+
+def export_products(queryset):
+    """Yield one JSON document per product (NDJSON), read in chunks of 500."""
+    serializer = ProductListSerializer()
+    for row in serializer.values(queryset).iterator(chunk_size=500):
+        yield orjson.dumps(serializer.to_row(row), option=orjson.OPT_APPEND_NEWLINE)
+
+
 # PRODUCTS
 
 
-class ProductListView(APIView):
+class ProductListView(CachedPageMixin, ListAPIView):
     permission_classes = [permissions.AllowAny]
-    pagination_class = CustomPagination
+    cache_namespace = "products"
+    serializer_class = ProductListSerializer
+    pagination_class = EstimatedCountPagination
+    filter_backends = [ProductFilterBackend, ProductSearchFilter, OrderingFilter]
+    filterset_class = ProductFilter
+    ordering_fields = ["price", "rating", "created_at", "name"]
+
+    def get_queryset(self):
+        return service.get_products()
+
+    def handle_exception(self, exc):
+        if isinstance(exc, InvalidFilters):
+            return custom_response(400, "Validation error", errors=exc.detail)
+        return super().handle_exception(exc)
+
+    @property
+    def paginator(self):
+        # ?cursor= (even empty, for the first page) switches to keyset paging.
+        if not hasattr(self, "_paginator"):
+            if CustomCursorPagination.cursor_query_param in self.request.query_params:
+                self._paginator = CustomCursorPagination()
+            else:
+                self._paginator = self.pagination_class()
+        return self._paginator
+
+    def list(self, request, *args, **kwargs):
+        # Rows come from values() and skip model instances and per-field
+        # serialization; output is identical to ProductListSerializer.
+        serializer = self.get_serializer()
+        queryset = serializer.values(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(queryset)
+        return self.get_paginated_response([serializer.to_row(row) for row in page])
 
     @extend_schema(
         summary="List all products",
         description="Returns a list of products with filtering, searching, and ordering.",
         parameters=[
-            OpenApiParameter("brand", str, description="Filter by brand ID"),
-            OpenApiParameter("category", str, description="Filter by category ID"),
-            OpenApiParameter(
-                "in_stock", bool, description="Filter by stock availability"
-            ),
-            OpenApiParameter("min_price", float, description="Filter by minimum price"),
-            OpenApiParameter("max_price", float, description="Filter by maximum price"),
             OpenApiParameter(
-                "search", str, description="Search in name or description"
-            ),
-            OpenApiParameter(
-                "ordering", str, description="Order by price, rating, created_at"
+                "cursor", str, description="Keyset pagination cursor (empty to start)"
             ),
         ],
         responses={
             200: OpenApiResponse(
-                response=ProductSerializer, description="List of products"
+                response=ProductListSerializer, description="List of products"
             ),
             400: OpenApiResponse(description="Bad Request"),  # bad request response
             403: OpenApiResponse(description="Permission Denied"),
         },
     )
-    def get(self, request):
-        queryset = service.get_products(request.query_params)
-        paginator = self.pagination_class()
-        page = paginator.paginate_queryset(queryset, request)
-        if page is not None:
-            serializer = ProductSerializer(page, many=True)
-            return paginator.get_paginated_response(serializer.data)
-
-        serializer = ProductSerializer(queryset, many=True)
-        return custom_response(200, "Products retrieved successfully", serializer.data)
+    def get(self, request, *args, **kwargs):
+        return self.get_cached_page(request)
 
     def post(self, request):
         if not request.user.is_authenticated or not request.user.is_staff:
@@ -96,13 +307,32 @@ class ProductListView(APIView):
 
         serializer = ProductSerializer(data=request.data)
         if serializer.is_valid():
-            product = service.create_product(serializer.validated_data)
-            return custom_response(
-                201, "Product created successfully", ProductSerializer(product).data
-            )
+            serializer.instance = service.create_product(serializer.validated_data)
+            return custom_response(201, "Product created successfully", serializer.data)
         return custom_response(400, "Validation error", errors=serializer.errors)
 
 
+class ProductExportView(ProductListView):
+    """
+    Every product matching the list filters, streamed as NDJSON. This is the
+    only unpaginated read of the catalog, so it is limited to staff.
+    """
+
+    permission_classes = [permissions.IsAdminUser]
+    http_method_names = ["get", "head", "options"]
+
+    @extend_schema(
+        summary="Export products",
+        description="Streams every matching product as newline-delimited JSON.",
+        responses={200: OpenApiResponse(response=ProductListSerializer)},
+    )
+    def get(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        return StreamingHttpResponse(
+            export_products(queryset), content_type="application/x-ndjson"
+        )
+
+
 class ProductDetailView(APIView):
     permission_classes = [permissions.AllowAny]
 
@@ -121,26 +351,26 @@ class ProductDetailView(APIView):
         },
     )
     def get(self, request, slug):
-        try:
-            product = service.get_product_by_slug(slug)
-            serializer = ProductSerializer(product)
-            return custom_response(
-                200, "Product retrieved successfully", serializer.data
-            )
-        except:
+        product = service.get_product_by_slug(slug)
+        if product is None:
             return custom_response(
                 404,
                 "Product not found",
                 errors={"detail": "No product found with this slug."},
             )
+        serializer = ProductSerializer(product)
+        return custom_response(200, "Product retrieved successfully", serializer.data)
 
 
 # BRANDS/CATEGORIES
 
 
-class BrandListView(APIView):
+class BrandListView(CachedPageMixin, APIView):
     permission_classes = [permissions.AllowAny]
-    pagination_class = CustomPagination
+    pagination_class = CachedCountPagination
+    cache_namespace = "brands"
+    local_cache = True
+    cache_max_age = 5 * 60
 
     @extend_schema(
         summary="List all brands",
@@ -154,20 +384,24 @@ class BrandListView(APIView):
         },
     )
     def get(self, request):
-        queryset = service.get_brands()
-        paginator = self.pagination_class()
-        page = paginator.paginate_queryset(queryset, request)
-        if page is not None:
-            serializer = BrandSerializer(page, many=True)
-            return paginator.get_paginated_response(serializer.data)
+        return self.get_cached_page(request)
 
-        serializer = BrandSerializer(queryset, many=True)
-        return custom_response(200, "Brands retrieved successfully", serializer.data)
+    def list(self, request):
+        serializer = BrandSerializer()
+        queryset = serializer.values(service.get_brands())
+        paginator = self.pagination_class()
+        page = paginator.paginate_queryset(queryset, request, self)
+        return paginator.get_paginated_response(
+            [serializer.to_row(row) for row in page]
+        )
 
 
-class CategoryListView(APIView):
+class CategoryListView(CachedPageMixin, APIView):
     permission_classes = [permissions.AllowAny]
-    pagination_class = CustomPagination
+    pagination_class = CachedCountPagination
+    cache_namespace = "categories"
+    local_cache = True
+    cache_max_age = 5 * 60
 
     @extend_schema(
         summary="List all categories",
@@ -181,107 +415,150 @@ class CategoryListView(APIView):
         },
     )
     def get(self, request):
-        queryset = service.get_categories()
-        paginator = self.pagination_class()
-        page = paginator.paginate_queryset(queryset, request)
-        if page is not None:
-            serializer = CategorySerializer(page, many=True)
-            return paginator.get_paginated_response(serializer.data)
+        return self.get_cached_page(request)
 
-        serializer = CategorySerializer(queryset, many=True)
-        return custom_response(
-            200, "Categories retrieved successfully", serializer.data
+    def list(self, request):
+        serializer = CategorySerializer()
+        queryset = serializer.values(service.get_categories())
+        paginator = self.pagination_class()
+        page = paginator.paginate_queryset(queryset, request, self)
+        return paginator.get_paginated_response(
+            [serializer.to_row(row) for row in page]
         )
 
 
 # CART
-class CartView(APIView):
-    permission_classes = [permissions.AllowAny]
+NOT_IN_CART = {"detail": "Cart item not found"}
 
-    def get_cart_queryset(self, request):
-        if request.user.is_authenticated:
-            return CartItem.objects.filter(user=request.user).select_related("product")
-        else:
-            session_id = request.session.session_key or request.session.save()
-            return CartItem.objects.filter(
-                session_id=request.session.session_key
-            ).select_related("product")
 
-    def get(self, request):
-        items = service.get_cart_items(request)
-        serializer = CartItemSerializer(items, many=True)
-        return custom_response(
-            200, "Cart items retrieved successfully", serializer.data
-        )
+class CartViewSet(viewsets.GenericViewSet):
+    """
+    The caller's cart. Items are addressed either by ``{pk}`` in the URL or,
+    for the original ``/cart/`` endpoint, by ``id`` in the request body.
+    """
 
-    def post(self, request):
-        serializer = CartItemSerializer(data=request.data)
+    permission_classes = [permissions.AllowAny]
+    serializer_class = CartItemSerializer
+    # Lets schema generation find the model without an owner to filter by.
+    queryset = CartItem.objects.none()
+
+    def get_queryset(self):
+        if getattr(self, "swagger_fake_view", False):
+            return self.queryset
+        # Built once per request (DRF creates a view instance per request);
+        # every action narrows this same queryset.
+        if not hasattr(self, "_cart_items"):
+            self._cart_items = service.get_cart_items(self.request)
+        return self._cart_items
+
+    def list(self, request):
+        if service.is_cart_known_empty(request):
+            return custom_response(200, "Cart items retrieved successfully", [])
+        serializer = self.get_serializer()
+        items = [
+            serializer.to_row(row) for row in serializer.values(self.get_queryset())
+        ]
+        if not items:
+            service.remember_empty_cart(request)
+        return custom_response(200, "Cart items retrieved successfully", items)
+
+    def create(self, request):
+        serializer = self.get_serializer(data=request.data)
         if serializer.is_valid():
             product = serializer.validated_data["product"]
             quantity = serializer.validated_data["quantity"]
-            cart_item = service.add_to_cart(request, product, quantity)
+            serializer.instance = service.add_to_cart(request, product, quantity)
             return custom_response(
-                201,
-                "Item added to cart successfully",
-                CartItemSerializer(cart_item).data,
+                201, "Item added to cart successfully", serializer.data
             )
         return custom_response(400, "Validation error", errors=serializer.errors)
 
-    def patch(self, request):
-        try:
-            item = service.update_cart_item(
-                request, request.data.get("id"), request.data.get("quantity")
-            )
-            return custom_response(
-                200, "Cart item updated", CartItemSerializer(item).data
-            )
-        except:
-            return custom_response(
-                404, "Item not found", errors={"detail": "Cart item not found"}
-            )
+    def partial_update(self, request, pk=None):
+        if pk is None and isinstance(request.data, list):
+            return self.partial_update_many(request)
+        serializer = CartItemUpdateSerializer(data=self.item_data(request, pk))
+        if not serializer.is_valid():
+            return custom_response(400, "Validation error", errors=serializer.errors)
+        item_id = serializer.validated_data["id"]
+        quantity = serializer.validated_data["quantity"]
+        if not service.update_cart_item(self.get_queryset(), item_id, quantity):
+            return custom_response(404, "Item not found", errors=NOT_IN_CART)
+        return custom_response(
+            200, "Cart item updated", {"id": item_id, "quantity": quantity}
+        )
 
-    def delete(self, request):
-        try:
-            service.delete_cart_item(request, request.data.get("id"))
+    def partial_update_many(self, request):
+        serializer = CartItemUpdateSerializer(
+            data=request.data, many=True, allow_empty=False
+        )
+        if not serializer.is_valid():
+            return custom_response(400, "Validation error", errors=serializer.errors)
+        quantities = {
+            change["id"]: change["quantity"] for change in serializer.validated_data
+        }
+        if not service.update_cart_items(self.get_queryset(), quantities):
+            return custom_response(404, "Item not found", errors=NOT_IN_CART)
+        return custom_response(
+            200,
+            "Cart items updated",
+            [{"id": pk, "quantity": quantity} for pk, quantity in quantities.items()],
+        )
+
+    def destroy(self, request, pk=None):
+        serializer = CartItemRefSerializer(data=self.item_data(request, pk))
+        if not serializer.is_valid():
+            return custom_response(400, "Validation error", errors=serializer.errors)
+        if service.delete_cart_item(
+            self.get_queryset(), serializer.validated_data["id"]
+        ):
             return custom_response(200, "Item removed from cart successfully")
-        except:
-            return custom_response(
-                404, "Item not found", errors={"detail": "Cart item not found"}
-            )
+        return custom_response(404, "Item not found", errors=NOT_IN_CART)
 
+    # /cart/<pk>/ routes: same handlers, but their own OpenAPI operations.
+    @extend_schema(operation_id="cart_item_partial_update")
+    def partial_update_item(self, request, pk):
+        return self.partial_update(request, pk)
 
-class CartClearView(APIView):
-    permission_classes = [permissions.AllowAny]
+    @extend_schema(operation_id="cart_item_destroy")
+    def destroy_item(self, request, pk):
+        return self.destroy(request, pk)
 
-    def post(self, request):
-        service.clear_cart(request)
-        return Response({"message": "Cart cleared"}, status=status.HTTP_204_NO_CONTENT)
+    def clear(self, request):
+        deleted = service.clear_cart(request)
+        return Response(
+            {"message": "Cart cleared", "deleted": deleted},
+            status=status.HTTP_204_NO_CONTENT,
+        )
+
+    @staticmethod
+    def item_data(request, pk):
+        # Anything but an object body is left for the serializer to reject.
+        if pk is None or not isinstance(request.data, Mapping):
+            return request.data
+        # items() yields single values for form data (QueryDict) as well.
+        data = dict(request.data.items())
+        data["id"] = pk
+        return data
 
 
 @csrf_exempt
 def stripe_checkout_session(request, pk):
-    request_data = json.loads(request.body)
-    product = get_object_or_404(Product, pk=pk)
+    request_data = orjson.loads(request.body)
+    name, description, price = get_object_or_404(
+        Product.objects.values_list("name", "description", "price"), pk=pk
+    )
 
     quantity = int(request_data.get("quantity", 1))
+    price_data = {
+        "currency": "pkr",
+        "product_data": {"name": name, "description": description},
+        "unit_amount": int(price * 100),
+    }
 
-    stripe.api_key = settings.STRIPE_SECRET_KEY
     checkout_session = stripe.checkout.Session.create(
         customer_email=request_data["email"],
         payment_method_types=["card"],
-        line_items=[
-            {
-                "price_data": {
-                    "currency": "pkr",
-                    "product_data": {
-                        "name": product.name,
-                        "description": product.description,
-                    },
-                    "unit_amount": int(product.price * 100),
-                },
-                "quantity": quantity,
-            }
-        ],
+        line_items=[{"price_data": price_data, "quantity": quantity}],
         mode="payment",
         customer_creation="always",
         success_url=settings.PAYMENT_SUCCESS_URL,
@@ -299,30 +576,31 @@ def payment_cancel(request):
     return render(request, "payment/cancel.html")
 
 
+def process_stripe_event(event_type, obj):
+    if event_type == "checkout.session.completed":
+        logger.info(
+            "Payment successful for %s, Amount: %s",
+            obj.get("customer_email"),
+            obj.get("amount_total"),
+        )
+    elif event_type == "payment_intent.payment_failed":
+        logger.warning("Payment failed: %s", obj.get("id"))
+
+
 @csrf_exempt
 def stripe_webhook(request):
     payload = request.body
     sig_header = request.META.get("HTTP_STRIPE_SIGNATURE")
-    event = None
 
     try:
         event = stripe.Webhook.construct_event(
             payload, sig_header, settings.STRIPE_WEBHOOK_SECRET
         )
-    except ValueError as e:
+    except ValueError:
         return JsonResponse({"error": "Invalid payload"}, status=400)
-    except stripe.error.SignatureVerificationError as e:
+    except stripe.error.SignatureVerificationError:
         return JsonResponse({"error": "Invalid signature"}, status=400)
 
-    if event["type"] == "checkout.session.completed":
-        session = event["data"]["object"]
-        customer_email = session.get("customer_email")
-        amount_total = session.get("amount_total")
-
-        print(f"Payment successful for {customer_email}, Amount: {amount_total}")
-
-    elif event["type"] == "payment_intent.payment_failed":
-        intent = event["data"]["object"]
-        print(f"Payment failed: {intent}")
-
+    # Inline, so Stripe retries the event if processing fails.
+    process_stripe_event(event["type"], event["data"]["object"])
     return JsonResponse({"status": "success"}, status=200)